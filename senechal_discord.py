@@ -5,23 +5,41 @@ This module implements a Discord bot that interacts with API endpoints
 based on configuration in a YAML file.
 """
 
+import asyncio
 import datetime
+import fcntl
+import json
 import logging
+import os
+import pickle
 import re
-from types import SimpleNamespace
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
 
+import aiohttp
 import click
 import discord
 import requests
 import yaml
+from requests.adapters import HTTPAdapter
+
+try:
+    # orjson decodes large responses several times faster than json
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 logger = logging.getLogger("discord")
 logger.setLevel(logging.INFO)
 logger.propagate = False
 
+# yyyy-mm-dd dates in rowing messages
+DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
 # Setup logging after config is loaded in init
 def setup_logging(config):
-    log_location = getattr(config.bot, "log_location", "./")
+    log_location = config["bot"].get("log_location", "./")
     log_path = f"{log_location.rstrip('/')}/discord.log"
     
     # File handler (logs to file)
@@ -38,39 +56,215 @@ def setup_logging(config):
     )
     logger.addHandler(console_handler)
 
+
+def make_session(pool_connections=10, pool_maxsize=20):
+    """
+    Create a requests session with a pooled HTTP adapter.
+
+    Reusing one session keeps connections to the API host alive, so only the
+    first request pays for the TCP and TLS handshake.
+
+    Args:
+        pool_connections: Number of host pools to cache
+        pool_maxsize: Maximum number of connections kept per host
+
+    Returns:
+        A configured requests.Session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def dump_response(resp_json, path="api_response.json"):
+    """
+    Write the last API response to disk for debugging.
+
+    Args:
+        resp_json: The decoded API response
+        path: File to overwrite with the response
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(resp_json, f, indent=2, ensure_ascii=False)
+    logger.info("API response saved to %s", path)
+
+
 # --- Config Class ---
 
 
-class Config(SimpleNamespace):
-    """Configuration class that loads YAML into a hierarchical namespace."""
+class Config:
+    """Configuration loader that reads YAML into plain dicts."""
+
+    # Bump when the shape of the cached object changes
+    CACHE_VERSION = 2
 
     @staticmethod
     def load(path: str):
         """
-        Load YAML configuration file into a namespace.
+        Load YAML configuration file into a dict.
+
+        The parsed result is cached next to the YAML file as
+        ``<path>.cache.pkl`` and reused until the YAML file's mtime changes.
 
         Args:
             path: Path to the YAML configuration file
 
         Returns:
-            A SimpleNamespace object with the configuration data
+            A dict with the configuration data
         """
-
-        def to_namespace(data):
-            if isinstance(data, dict):
-                return SimpleNamespace(**{k: to_namespace(v) for k, v in data.items()})
-            if isinstance(data, list):
-                return [to_namespace(i) for i in data]
-            return data
+        cache_path = f"{path}.cache.pkl"
 
         with open(path, encoding="utf-8") as config_file:
+            # Serialise concurrent starts so they don't race on the cache
+            fcntl.flock(config_file, fcntl.LOCK_EX)
+            stat = os.fstat(config_file.fileno())
+            key = (Config.CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+
+            try:
+                with open(cache_path, "rb") as cache_file:
+                    cached_key, cached = pickle.load(cache_file)
+                if cached_key == key:
+                    return cached
+            except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+                pass  # Missing or unreadable cache, fall back to YAML
+
             data = yaml.safe_load(config_file)
-        return to_namespace(data)
+
+            tmp_path = f"{cache_path}.tmp"
+            try:
+                # The cache holds the same secrets as the config, so keep its mode
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, stat.st_mode & 0o777)
+                with os.fdopen(fd, "wb") as tmp_file:
+                    pickle.dump((key, data), tmp_file)
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                pass  # Caching is best effort, e.g. read-only config directory
+
+        return data
 
 
 # --- Discord Bot ---
 
 
+class Command(NamedTuple):
+    """A channel command flattened from config for fast dispatch."""
+
+    cmd_type: str
+    prefix: str
+    description: str
+    url: str
+    headers: dict
+    args: dict
+    empty_fields: tuple
+
+
+def build_commands(chan_info):
+    """
+    Flatten the commands configured for a channel.
+
+    Args:
+        chan_info: The channel's configuration dict
+
+    Returns:
+        A list of Command tuples in config order
+    """
+    commands = []
+    for cmd_type, cmd_config in chan_info.items():
+        # Skip id field and any non-command attributes
+        if cmd_type == "id" or not isinstance(cmd_config, dict) or "cmd_prefix" not in cmd_config:
+            continue
+
+        api_call = cmd_config["api_call"]
+        headers = api_call.get("headers") or {}
+        args = api_call.get("args") or {}
+        commands.append(
+            Command(
+                cmd_type=cmd_type,
+                prefix=cmd_config["cmd_prefix"],
+                description=cmd_config.get("description", f"{cmd_type} command"),
+                url=api_call["url"],
+                headers=headers,
+                args=args,
+                empty_fields=tuple(key for key, value in args.items() if value == ""),
+            )
+        )
+    return commands
+
+
+class CommandIndex:
+    """Prefix lookup table for a channel's commands."""
+
+    def __init__(self, commands):
+        """
+        Index commands by prefix, grouped by prefix length.
+
+        Args:
+            commands: The channel's Command tuples in config order
+        """
+        self._by_prefix = {}
+        for order, command in enumerate(commands):
+            # The first command in config order wins for a duplicated prefix
+            self._by_prefix.setdefault(command.prefix, (order, command))
+        self._lengths = sorted({len(prefix) for prefix in self._by_prefix})
+
+    def match(self, content):
+        """
+        Find the command whose prefix starts the message.
+
+        One dict lookup per distinct prefix length replaces a startswith()
+        per command. When several prefixes match, the earliest in config
+        order wins, as with a linear scan.
+
+        Args:
+            content: The message content
+
+        Returns:
+            The matching Command, or None
+        """
+        best = None
+        for length in self._lengths:
+            if length > len(content):
+                break
+            hit = self._by_prefix.get(content[:length])
+            if hit and (best is None or hit[0] < best[0]):
+                best = hit
+        return best[1] if best else None
+
+
+class TokenBucket:
+    """Token bucket rate limiter."""
+
+    def __init__(self, capacity, refill_rate):
+        """
+        Create a full bucket.
+
+        Args:
+            capacity: Maximum number of tokens, i.e. the allowed burst
+            refill_rate: Tokens added per second
+        """
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+
+    def try_consume(self):
+        """
+        Take a token if one is available.
+
+        Returns:
+            True if a token was taken, False if the caller is rate limited
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+        self.last_refill = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
 class SenechalDiscordClient(discord.Client):
     """Discord client for the Senechal project with API integration."""
 
@@ -85,21 +279,45 @@ class SenechalDiscordClient(discord.Client):
         intents.message_content = True
         super().__init__(intents=intents)
         self.config = config
+        self._http = None
+
+        # Channel lookup table, the configured channels never change at runtime
+        self._channel_map = {}
+        # Per-channel rate limits, a channel's rate_limit overrides the bot's
+        self._buckets = {}
+        default_limit = config["bot"].get("rate_limit")
+        for chan_name, chan_info in config["channels"].items():
+            commands = build_commands(chan_info)
+            self._channel_map[chan_info["id"]] = (chan_name, commands, CommandIndex(commands))
+
+            limit = chan_info.get("rate_limit", default_limit)
+            if limit:
+                self._buckets[chan_info["id"]] = TokenBucket(limit["capacity"], limit["refill_rate"])
         
         # Setup logging with configuration
         setup_logging(config)
 
+    async def setup_hook(self):
+        """Create the aiohttp session once the event loop is running."""
+        self._http = aiohttp.ClientSession()
+
     async def on_ready(self):
         """Handle bot ready event by logging successful connection."""
-        if not self.config.bot.quiet:
+        if not self.config["bot"]["quiet"]:
             print(f"✅ Logged in as {self.user.name}")
         
         # Send startup announcement to senechal channel
-        senechal_channel_id = self.config.channels.senechal.id
+        senechal_channel_id = self.config["channels"]["senechal"]["id"]
         channel = self.get_channel(senechal_channel_id)
         if channel:
             await channel.send("🤖 Senechal bot is now online and ready to assist!")
 
+    async def close(self):
+        """Close the HTTP session along with the Discord connection."""
+        if self._http is not None:
+            await self._http.close()
+        await super().close()
+
     async def on_message(self, message):
         """
         Handle incoming messages and respond based on configuration.
@@ -114,108 +332,95 @@ class SenechalDiscordClient(discord.Client):
         logger.info("Message from %s", message.author)
 
         # Identify the channel
-        channel_config = None
-        for chan_name, chan_info in vars(self.config.channels).items():
-            if message.channel.id == chan_info.id:
-                channel_config = chan_info
-                logger.info(f"Found matching channel: {chan_name}")
-                break
-
-        if not channel_config:
+        entry = self._channel_map.get(message.channel.id)
+        if not entry:
             return  # Message not in a configured channel
+
+        chan_name, commands, index = entry
+        logger.info("Found matching channel: %s", chan_name)
         
         # Handle /help command for any configured channel
         if message.content.strip() == "/help":
             help_message = f"**Available commands in this channel:**\n"
             
-            for cmd_type, cmd_config in vars(channel_config).items():
-                if cmd_type == "id" or not hasattr(cmd_config, "cmd_prefix"):
-                    continue
-                    
-                cmd_prefix = cmd_config.cmd_prefix
-                description = getattr(cmd_config, "description", f"{cmd_type} command")
-                help_message += f"• `{cmd_prefix}` - {description}\n"
+            for command in commands:
+                help_message += f"• `{command.prefix}` - {command.description}\n"
             
             help_message += "• `/help` - Show this help message"
             await message.channel.send(help_message)
             return
             
-        # Look through command types for this channel
-        for cmd_type, cmd_config in vars(channel_config).items():
-            # Skip id field and any non-command attributes
-            if cmd_type == "id" or not hasattr(cmd_config, "cmd_prefix"):
-                continue
-                
-            cmd_prefix = cmd_config.cmd_prefix
+        # Find the command whose prefix starts the message
+        command = index.match(message.content)
+        if command is None:
+            return
+
+        cmd_type = command.cmd_type
+        cmd_prefix = command.prefix
+        logger.info("Command match found: %s with prefix %s", cmd_type, cmd_prefix)
+
+        bucket = self._buckets.get(message.channel.id)
+        if bucket and not bucket.try_consume():
+            logger.warning("Rate limited command %s in channel %s", cmd_type, chan_name)
+            await message.channel.send("⏳ Rate limited, please try again shortly")
+            return
+        
+        if cmd_type == "rowing" and message.attachments:
+            # Handle rowing image uploads
+            image_url = message.attachments[0].url
+            
+            # Check message for yyyy-mm-dd dates, default to current date
+            date_match = DATE_RE.search(message.content)
+            if date_match:
+                date = date_match.group()
+            else:
+                date = datetime.datetime.now().strftime("%Y-%m-%d")
+            
+            logger.info("Processing rowing image with date: %s", date)
+            
+            # Prepare args
+            args = {"image_url": image_url, "workout_date": date}
+            
+            await self.handle_api_call(command.url, args, message.channel, command.headers)
+        
+        else:
+            # Handle text commands
+            content = message.content[len(cmd_prefix):].strip()
+            logger.info("Command content: %s", content)
             
-            # Check if message starts with this command prefix
-            if message.content.startswith(cmd_prefix):
-                logger.info(f"Command match found: {cmd_type} with prefix {cmd_prefix}")
+            # Get args structure from config
+            args = dict(command.args)
+            
+            # Handle multi-parameter commands
+            empty_fields = command.empty_fields
+            
+            if len(empty_fields) == 0:
+                # No empty fields - command doesn't need user input
+                pass
+            elif len(empty_fields) == 1:
+                # Single parameter - use existing behavior
+                args[empty_fields[0]] = content
+            elif cmd_type == "llm":
+                # Special handling for /llm command with prompt and query_url/query_text
+                await self.handle_llm_command(content, args, command, message.channel)
+                return
+            else:
+                # Multi-parameter - parse space-separated values
+                parts = content.split(' ', len(empty_fields) - 1)  # Split into at most len(empty_fields) parts
                 
-                if cmd_type == "rowing" and message.attachments:
-                    # Handle rowing image uploads
-                    image_url = message.attachments[0].url
-                    
-                    # Default to current date if not provided
-                    date = datetime.datetime.now().strftime("%Y-%m-%d")
-                    
-                    # Check message for yyyy-mm-dd dates
-                    if re.search(r"\d{4}-\d{2}-\d{2}", message.content):
-                        date = re.search(r"\d{4}-\d{2}-\d{2}", message.content).group()
-                    
-                    logger.info(f"Processing rowing image with date: {date}")
-                    
-                    # Prepare args
-                    args = {"image_url": image_url, "workout_date": date}
-                    api_url = cmd_config.api_call.url
-                    headers = vars(cmd_config.api_call.headers) if hasattr(cmd_config.api_call, "headers") else {}
-                    
-                    await self.handle_api_call(api_url, args, message.channel, headers)
+                if len(parts) != len(empty_fields):
+                    await message.channel.send(f"❌ Expected {len(empty_fields)} parameters: {', '.join(empty_fields)}")
+                    return
                 
-                else:
-                    # Handle text commands
-                    content = message.content[len(cmd_prefix):].strip()
-                    logger.info(f"Command content: {content}")
-                    
-                    # Get args structure from config
-                    args = vars(cmd_config.api_call.args).copy()
-                    
-                    # Handle multi-parameter commands
-                    empty_fields = [key for key, value in args.items() if value == ""]
-                    
-                    if len(empty_fields) == 0:
-                        # No empty fields - command doesn't need user input
-                        pass
-                    elif len(empty_fields) == 1:
-                        # Single parameter - use existing behavior
-                        args[empty_fields[0]] = content
-                    elif cmd_type == "llm":
-                        # Special handling for /llm command with prompt and query_url/query_text
-                        await self.handle_llm_command(content, args, cmd_config, message.channel)
-                        break
-                    else:
-                        # Multi-parameter - parse space-separated values
-                        parts = content.split(' ', len(empty_fields) - 1)  # Split into at most len(empty_fields) parts
-                        
-                        if len(parts) != len(empty_fields):
-                            await message.channel.send(f"❌ Expected {len(empty_fields)} parameters: {', '.join(empty_fields)}")
-                            break
-                        
-                        # Assign parts to empty fields in order they appear in config
-                        for i, field in enumerate(empty_fields):
-                            args[field] = parts[i]
-                        
-                        logger.info(f"Multi-parameter command parsed: {args}")
-                    
-                    api_url = cmd_config.api_call.url
-                    headers = vars(cmd_config.api_call.headers) if hasattr(cmd_config.api_call, "headers") else {}
-                    
-                    await self.handle_api_call(api_url, args, message.channel, headers)
+                # Assign parts to empty fields in order they appear in config
+                for i, field in enumerate(empty_fields):
+                    args[field] = parts[i]
                 
-                # We found a matching command, stop checking
-                break
+                logger.info("Multi-parameter command parsed: %s", args)
+            
+            await self.handle_api_call(command.url, args, message.channel, command.headers)
 
-    async def handle_llm_command(self, content, args, cmd_config, channel):
+    async def handle_llm_command(self, content, args, command, channel):
         """
         Handle the special /llm command with prompt and query_url/query_text parameters.
         
@@ -256,12 +461,10 @@ class SenechalDiscordClient(discord.Client):
             if "query_url" in args:
                 del args["query_url"]
         
-        logger.info(f"LLM command parsed - prompt: {prompt}, content: {query_content}")
+        logger.info("LLM command parsed - prompt: %s, content: %s", prompt, query_content)
         
         # Make the API call
-        api_url = cmd_config.api_call.url
-        headers = vars(cmd_config.api_call.headers) if hasattr(cmd_config.api_call, "headers") else {}
-        await self.handle_api_call(api_url, args, channel, headers)
+        await self.handle_api_call(command.url, args, channel, command.headers)
 
     async def handle_api_call(self, url, args, channel, headers=None):
         """
@@ -274,24 +477,25 @@ class SenechalDiscordClient(discord.Client):
             headers: Optional HTTP headers for the request
         """
         try:
-            # Convert args to dictionary if it's a SimpleNamespace
-            if isinstance(args, SimpleNamespace):
-                args = vars(args)
-
             logger.info("Making API call to %s with args: %s", url, args)
             if headers:
                 logger.info("Using headers: %s", headers)
-                resp = requests.post(url, json=args, headers=headers, timeout=120)
+                timeout = aiohttp.ClientTimeout(total=120)
             else:
-                resp = requests.post(url, json=args, timeout=10)
+                timeout = aiohttp.ClientTimeout(total=10)
 
-            resp_json = resp.json()
+            async with self._http.post(
+                url, json=args, headers=headers, timeout=timeout
+            ) as resp:
+                resp_json = json_loads(await resp.read())
 
-            with open("api_response.json", "w") as f:
-                yaml.dump(resp_json, f, default_flow_style=False, allow_unicode=True)
-            logger.info("API response saved to api_response.json")
+            if self.config["bot"].get("debug_dump_responses", False):
+                # Write off the event loop, this is debug output only
+                await asyncio.get_running_loop().run_in_executor(
+                    None, dump_response, resp_json
+                )
 
-            logger.info("API response: %s", resp_json)
+            logger.debug("API response: %s", resp_json)
 
             status = resp_json.get("status", "Error")
             message = resp_json.get("message", "No message provided")
@@ -305,7 +509,10 @@ class SenechalDiscordClient(discord.Client):
 
             await channel.send(reply)
 
-        except requests.RequestException as request_error:
+        except asyncio.TimeoutError:
+            logger.error("Timed out calling API: %s", url)
+            await channel.send("❌ Network error calling API: request timed out")
+        except aiohttp.ClientError as request_error:
             logger.error("Network error calling API: %s", request_error)
             await channel.send(f"❌ Network error calling API: {request_error}")
         except ValueError as value_error:
@@ -329,7 +536,7 @@ def cli(ctx, config, quiet):
     """Senechal Discord bot CLI interface."""
     cfg = Config.load(config)
     if quiet:
-        cfg.bot.quiet = quiet
+        cfg["bot"]["quiet"] = quiet
     ctx.obj = {"cfg": cfg}
 
 
@@ -339,7 +546,7 @@ def start(ctx):
     """Start the Discord bot."""
     cfg = ctx.obj["cfg"]
     client = SenechalDiscordClient(cfg)
-    client.run(cfg.bot.token)
+    client.run(cfg["bot"]["token"])
 
 
 @cli.command()
@@ -352,30 +559,55 @@ def check(ctx):
     endpoints = []
 
     # Scan for endpoints in the new nested structure
-    for chan_name, chan_info in vars(cfg.channels).items():
-        for cmd_type, cmd_config in vars(chan_info).items():
-            if cmd_type == "id":
+    for chan_name, chan_info in cfg["channels"].items():
+        for cmd_type, cmd_config in chan_info.items():
+            if cmd_type == "id" or not isinstance(cmd_config, dict):
                 continue
             
-            if hasattr(cmd_config, "api_call") and hasattr(cmd_config.api_call, "url"):
+            api_call = cmd_config.get("api_call")
+            if isinstance(api_call, dict) and "url" in api_call:
                 endpoint_name = f"Channel '{chan_name}' - {cmd_type}"
-                endpoint_url = cmd_config.api_call.url
+                endpoint_url = api_call["url"]
                 endpoints.append((endpoint_name, endpoint_url))
 
-    for name, url in endpoints:
-        try:
-            # Try a GET request first to check if endpoint exists
-            resp = requests.get(url, timeout=5)
-            if resp.status_code == 200:
-                click.echo(f"✅ {name}: OK")
-            else:
-                click.echo(f"⚠️ {name}: HTTP {resp.status_code}")
-        except requests.ConnectionError:
-            click.echo(f"❌ {name}: Connection error")
-        except requests.Timeout:
-            click.echo(f"❌ {name}: Timeout error")
-        except requests.RequestException as error:
-            click.echo(f"❌ {name}: Request error ({error})")
+    if not endpoints:
+        return
+
+    # Probe concurrently, results are still reported in endpoint order
+    workers = min(32, len(endpoints))
+    session = make_session(pool_maxsize=workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(lambda endpoint: probe_endpoint(session, *endpoint), endpoints):
+            click.echo(result)
+
+
+def probe_endpoint(session, name, url):
+    """
+    Check whether an API endpoint responds.
+
+    Args:
+        session: The requests session to probe with
+        name: Display name for the endpoint
+        url: The endpoint URL
+
+    Returns:
+        A one-line status message for the endpoint
+    """
+    try:
+        # HEAD avoids downloading the body, fall back to GET if it isn't allowed
+        resp = session.head(url, timeout=5, allow_redirects=True)
+        if resp.status_code == 405:
+            resp = session.get(url, timeout=5, stream=True)
+            resp.close()
+        if resp.status_code == 200:
+            return f"✅ {name}: OK"
+        return f"⚠️ {name}: HTTP {resp.status_code}"
+    except requests.ConnectionError:
+        return f"❌ {name}: Connection error"
+    except requests.Timeout:
+        return f"❌ {name}: Timeout error"
+    except requests.RequestException as error:
+        return f"❌ {name}: Request error ({error})"
 
 
 # --- Main Entrypoint ---